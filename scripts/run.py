@@ -4,10 +4,12 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
 import logging
 import os
 import sys
 import uuid
+from contextlib import nullcontext
 from pathlib import Path
 
 # Allow running from repo root without installing the package.
@@ -15,10 +17,11 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from dotenv import load_dotenv
 
-from src.client import TogetherClient
+from src.cache import ResponseCache
+from src.client import AsyncTogetherClient
 from src.collector import ResponseCollector
 from src.prompts import load_prompts
-from src.runner import Runner
+from src.runner import BatchFailedError, BatchRunner, Runner
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,6 +32,7 @@ logging.basicConfig(
 DEFAULT_MODELS = [
     "meta-llama/Llama-3.2-3B-Instruct-Turbo",
 ]
+DEFAULT_CONCURRENCY = 16
 
 
 def parse_args() -> argparse.Namespace:
@@ -66,6 +70,78 @@ def parse_args() -> argparse.Namespace:
         dest="max_tokens",
         help="Maximum tokens to generate per response (default: 512).",
     )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f"Maximum number of requests in flight at once (default: {DEFAULT_CONCURRENCY}).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help=(
+            "Seconds before an API request times out (default: 60). Each call, "
+            "including a full stream, is also capped at twice this."
+        ),
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        default=None,
+        help="Requests-per-minute ceiling to stay under (default: unlimited).",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        default=None,
+        help="Tokens-per-minute ceiling to stay under (default: unlimited).",
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help=(
+            "Issue identical (model, prompt, params) requests only once and reuse the "
+            "response. Always on when --temperature is 0."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        dest="cache_dir",
+        help=(
+            "Persist responses here so reruns skip requests that already completed. "
+            "Implies --dedupe."
+        ),
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help=(
+            "Stream responses and write each content delta as its own record while "
+            "the completion generates (logprob prompts are never streamed)."
+        ),
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help=(
+            "Submit all requests as one Together batch job and wait for it to finish "
+            "(cheaper, but can take hours). Falls back to per-request calls if the "
+            "batch can't be submitted."
+        ),
+    )
+    parser.add_argument(
+        "--iso-timestamps",
+        action="store_true",
+        dest="iso_timestamps",
+        help="Write record timestamps as UTC ISO-8601 strings instead of Unix epoch seconds.",
+    )
+    parser.add_argument(
+        "--pretty",
+        action="store_true",
+        help="Write indented, human-readable records instead of compact JSONL.",
+    )
     parser.add_argument(
         "--run-id",
         default=None,
@@ -75,6 +151,13 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+async def _run(runner: Runner, client: AsyncTogetherClient, prompts: list) -> None:
+    try:
+        await runner.run_async(prompts)
+    finally:
+        await client.close()
+
+
 def main() -> None:
     load_dotenv()
     args = parse_args()
@@ -96,7 +179,7 @@ def main() -> None:
     else:
         output_path = repo_root / "data" / "responses" / f"{prompt_stem}_{run_id}.jsonl"
 
-    n_variants = sum(len(template.expand()) for template, _ in prompts)
+    n_variants = sum(template.expansion_count for template, _ in prompts)
     n_models = len(args.models)
     n_requests = n_models * n_variants
 
@@ -106,6 +189,26 @@ def main() -> None:
     print(f"  Total calls : {n_requests}")
     print(f"  Output      : {output_path}")
     print()
+    if args.batch:
+        per_request = [
+            flag
+            for flag, used in (
+                ("--stream", args.stream),
+                ("--dedupe", args.dedupe),
+                ("--cache-dir", args.cache_dir is not None),
+                ("--rpm", args.rpm is not None),
+                ("--tpm", args.tpm is not None),
+                ("--concurrency", args.concurrency != DEFAULT_CONCURRENCY),
+            )
+            if used
+        ]
+        if per_request:
+            print(
+                f"Warning: {', '.join(per_request)} only apply to per-request calls and are "
+                "ignored by --batch unless the batch can't be submitted.",
+                file=sys.stderr,
+            )
+            print()
     try:
         confirm = input("Proceed? [y/N] ").strip().lower()
     except (EOFError, KeyboardInterrupt):
@@ -116,18 +219,32 @@ def main() -> None:
         sys.exit(0)
     print()
 
-    client = TogetherClient()
+    client = AsyncTogetherClient(timeout=args.timeout)
     gen_kwargs = {"temperature": args.temperature, "max_tokens": args.max_tokens}
 
-    with ResponseCollector(output_path) as collector:
-        runner = Runner(
+    cache_ctx = ResponseCache(args.cache_dir) if args.cache_dir else nullcontext()
+    with ResponseCollector(output_path, pretty=args.pretty) as collector, cache_ctx as cache:
+        runner_cls = BatchRunner if args.batch else Runner
+        runner = runner_cls(
             client=client,
             collector=collector,
             models=args.models,
             gen_kwargs=gen_kwargs,
             run_id=run_id,
+            max_concurrency=args.concurrency,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            dedupe=args.dedupe or cache is not None,
+            cache=cache,
+            stream=args.stream,
+            per_call_timeout=2 * args.timeout,
+            iso_timestamps=args.iso_timestamps,
         )
-        runner.run(prompts)
+        try:
+            asyncio.run(_run(runner, client, prompts))
+        except BatchFailedError as exc:
+            print(f"\n{exc}; no responses were saved.", file=sys.stderr)
+            sys.exit(1)
 
     print(f"\nDone. Responses written to: {output_path}")
 
@@ -0,0 +1,58 @@
+"""On-disk cache of completed responses, keyed by request content."""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+from pathlib import Path
+from types import TracebackType
+
+import orjson
+
+from .collector import _model_default
+
+
+def request_key(model: str, messages: list[dict], gen_kwargs: dict) -> str:
+    """Stable digest identifying a request by model, messages (roles included) and params."""
+    raw = orjson.dumps([model, messages, gen_kwargs], option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+
+class ResponseCache:
+    """Context manager mapping request keys to client results in a SQLite file
+    under *cache_dir*, so a rerun can skip requests that already completed."""
+
+    def __init__(self, cache_dir: str | Path):
+        self.path = Path(cache_dir) / "responses.sqlite"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db: sqlite3.Connection | None = None
+
+    def __enter__(self) -> "ResponseCache":
+        self._db = sqlite3.connect(self.path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, result BLOB)")
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def get(self, key: str) -> dict | None:
+        if self._db is None:
+            raise RuntimeError("ResponseCache must be used as a context manager.")
+        row = self._db.execute("SELECT result FROM responses WHERE key = ?", (key,)).fetchone()
+        return orjson.loads(row[0]) if row else None
+
+    def put(self, key: str, result: dict) -> None:
+        if self._db is None:
+            raise RuntimeError("ResponseCache must be used as a context manager.")
+        blob = orjson.dumps(result, default=_model_default)
+        with self._db:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?)", (key, blob))
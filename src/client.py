@@ -1,16 +1,84 @@
 """TogetherAI API wrapper."""
 
 import os
-from together import Together
+from collections.abc import AsyncIterator
+from pathlib import Path
+
+import httpx
+import orjson
+from together import AsyncTogether, Together
 import Keys
 
+# Keep-alive pool limits (HTTP/2 where the server supports it), so concurrent
+# calls multiplex over a few connections instead of each paying a fresh
+# TCP + TLS handshake.
+_POOL_LIMITS = httpx.Limits(
+    max_connections=200,
+    max_keepalive_connections=100,
+    keepalive_expiry=60,
+)
+
+# Every call is bounded: a request timeout so a stalled socket can't pin a
+# worker, and an output cap when the caller doesn't pass max_tokens. SDK
+# retries default to off in both clients; the Runner owns retry policy via
+# tenacity, and stacking both would multiply attempts on rate limits.
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_MAX_TOKENS = 512
+
+
+def _resolve_api_key(api_key: str | None) -> str:
+    key = api_key or Keys.TOGETHER_API_KEY or os.environ.get("TOGETHER_API_KEY")
+    if not key:
+        raise ValueError("TOGETHER_API_KEY not set in environment or passed explicitly.")
+    return key
+
+
+def _usage_dict(usage) -> dict:
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+def _to_result(response) -> dict:
+    """Flatten a chat completion response into the dict shape used by the runner."""
+    choice = response.choices[0]
+    return {
+        "text": choice.message.content,
+        "model": response.model,
+        "finish_reason": choice.finish_reason,
+        "usage": _usage_dict(response.usage),
+        "logprobs": getattr(choice, "logprobs", None),
+    }
+
+
+def _result_from_json(body: dict) -> dict:
+    """Same as _to_result, for a chat completion already decoded from JSON
+    (as found in batch output files)."""
+    choice = body["choices"][0]
+    return {
+        "text": (choice.get("message") or {}).get("content"),
+        "model": body.get("model"),
+        "finish_reason": choice.get("finish_reason"),
+        "usage": body.get("usage"),
+        "logprobs": choice.get("logprobs"),
+    }
+
 
 class TogetherClient:
-    def __init__(self, api_key: str | None = None):
-        key = api_key or Keys.TOGETHER_API_KEY or os.environ.get("TOGETHER_API_KEY")
-        if not key:
-            raise ValueError("TOGETHER_API_KEY not set in environment or passed explicitly.")
-        self._client = Together(api_key=key)
+    def __init__(
+        self,
+        api_key: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = 0,
+    ):
+        self._client = Together(
+            api_key=_resolve_api_key(api_key),
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=httpx.Client(http2=True, limits=_POOL_LIMITS, timeout=timeout),
+        )
 
     def complete(self, model: str, messages: list[dict], **gen_kwargs) -> dict:
         """Call chat completions and return the full response as a dict.
@@ -19,7 +87,8 @@ class TogetherClient:
             model: Together model ID (e.g. 'meta-llama/Llama-3-8b-chat-hf').
             messages: List of {'role': ..., 'content': ...} dicts.
             **gen_kwargs: Generation params forwarded to the API
-                          (temperature, max_tokens, top_p, etc.).
+                          (temperature, max_tokens, top_p, etc.). max_tokens
+                          defaults to DEFAULT_MAX_TOKENS.
 
         Returns:
             Dict with keys: 'text', 'model', 'usage', 'finish_reason'.
@@ -27,17 +96,97 @@ class TogetherClient:
         response = self._client.chat.completions.create(
             model=model,
             messages=messages,
-            **gen_kwargs,
+            **{"max_tokens": DEFAULT_MAX_TOKENS, **gen_kwargs},
         )
-        choice = response.choices[0]
+        return _to_result(response)
+
+
+class AsyncTogetherClient:
+    """Asyncio counterpart of TogetherClient, used by the Runner to overlap
+    request latency across many concurrent calls."""
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        max_retries: int = 0,
+    ):
+        self._client = AsyncTogether(
+            api_key=_resolve_api_key(api_key),
+            timeout=timeout,
+            max_retries=max_retries,
+            http_client=httpx.AsyncClient(http2=True, limits=_POOL_LIMITS, timeout=timeout),
+        )
+
+    async def close(self) -> None:
+        """Close the pooled connections; call once the run is finished."""
+        await self._client.close()
+
+    async def complete(self, model: str, messages: list[dict], **gen_kwargs) -> dict:
+        """Awaitable version of TogetherClient.complete; same arguments and result."""
+        response = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            **{"max_tokens": DEFAULT_MAX_TOKENS, **gen_kwargs},
+        )
+        return _to_result(response)
+
+    async def stream(self, model: str, messages: list[dict], **gen_kwargs) -> AsyncIterator[dict]:
+        """Stream a chat completion, yielding one dict per chunk as it arrives.
+
+        Each dict has 'text' (the content delta, possibly empty), 'finish_reason'
+        and 'usage'; the latter two are None until the final chunk(s) carry them.
+        """
+        chunks = await self._client.chat.completions.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            **{"max_tokens": DEFAULT_MAX_TOKENS, **gen_kwargs},
+        )
+        async for chunk in chunks:
+            choice = chunk.choices[0] if chunk.choices else None
+            yield {
+                "text": (choice.delta.content or "") if choice else "",
+                "finish_reason": choice.finish_reason if choice else None,
+                "usage": _usage_dict(chunk.usage) if chunk.usage else None,
+            }
+
+    async def submit_batch(self, input_path: str | Path) -> str:
+        """Upload a batch input JSONL file and start a chat completions batch on it.
+
+        Returns the batch job ID.
+        """
+        uploaded = await self._client.files.upload(input_path, purpose="batch-api", check=False)
+        created = await self._client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return created.job.id
+
+    async def batch_status(self, batch_id: str) -> dict:
+        """Return the job's 'status', 'progress', 'output_file_id' and 'error'."""
+        job = await self._client.batches.retrieve(batch_id)
         return {
-            "text": choice.message.content,
-            "model": response.model,
-            "finish_reason": choice.finish_reason,
-            "usage": {
-                "prompt_tokens": response.usage.prompt_tokens,
-                "completion_tokens": response.usage.completion_tokens,
-                "total_tokens": response.usage.total_tokens,
-            },
-            "logprobs": getattr(choice, "logprobs", None),
+            "status": job.status,
+            "progress": job.progress,
+            "output_file_id": job.output_file_id,
+            "error": job.error,
         }
+
+    async def batch_results(self, output_file_id: str) -> AsyncIterator[tuple[str, dict | None, str | None]]:
+        """Download a finished batch's output and yield (custom_id, result, error) per line.
+
+        result has the same shape as complete() and is None when that request failed.
+        """
+        response = await self._client.files.content(output_file_id)
+        for line in (await response.read()).split(b"\n"):
+            if not line.strip():
+                continue
+            item = orjson.loads(line)
+            reply = item.get("response") or {}
+            body = reply.get("body")
+            if item.get("error") or reply.get("status_code", 200) != 200 or not body:
+                yield item.get("custom_id"), None, str(item.get("error") or body)
+            else:
+                yield item.get("custom_id"), _result_from_json(body), None
@@ -0,0 +1,90 @@
+"""Client-side rate limiting for the TogetherAI token-per-minute budget."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import logging
+import time
+from collections import deque
+
+try:
+    import tiktoken
+except ImportError:  # optional; fall back to a character-count heuristic
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+@functools.cache
+def _encoding():
+    """cl100k_base encoding, loaded on first use; None if unavailable.
+
+    Loading may download the BPE file, so it is deferred until a TPM limit is
+    actually in play, and any failure (e.g. offline) falls back to the heuristic.
+    """
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        logger.warning("Could not load tiktoken encoding (%s); estimating ~4 chars/token.", exc)
+        return None
+
+
+def estimate_tokens(messages: list[dict]) -> int:
+    """Rough prompt token count for *messages*.
+
+    Uses tiktoken's cl100k_base encoding when installed (not the exact tokenizer of
+    every Together model, but close enough for budgeting), otherwise ~4 chars/token.
+    """
+    text = "".join(m.get("content") or "" for m in messages)
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return len(text) // 4 + 1
+
+
+class TokenRateLimiter:
+    """Sliding-window limiter that keeps token usage under *tokens_per_minute*.
+
+    Callers reserve an estimated cost with acquire() before issuing a request and
+    correct it with settle() once the response reports its real usage, so the
+    window tracks actual consumption rather than guesses.
+    """
+
+    def __init__(self, tokens_per_minute: int, window: float = 60.0):
+        self.capacity = tokens_per_minute
+        self.window = window
+        self._entries: deque[list] = deque()  # [timestamp, tokens]
+        self._used = 0
+
+    def _expire(self, now: float) -> None:
+        while self._entries and now - self._entries[0][0] >= self.window:
+            entry = self._entries.popleft()
+            self._used -= entry[1]
+            entry[0] = None  # mark as expired so a late settle() is a no-op
+
+    async def acquire(self, tokens: int) -> list:
+        """Wait until *tokens* fit in the current window and reserve them.
+
+        Returns an opaque reservation to pass to settle(). Requests larger than the
+        whole budget are clamped so they can still proceed once the window drains.
+        """
+        tokens = min(tokens, self.capacity)
+        while True:
+            now = time.monotonic()
+            self._expire(now)
+            if self._used + tokens <= self.capacity:
+                entry = [now, tokens]
+                self._entries.append(entry)
+                self._used += tokens
+                return entry
+            await asyncio.sleep(self._entries[0][0] + self.window - now)
+
+    def settle(self, reservation: list, actual_tokens: int) -> None:
+        """Replace a reservation's estimate with the usage the API reported."""
+        if reservation[0] is None:
+            return
+        self._used += actual_tokens - reservation[1]
+        reservation[1] = actual_tokens
@@ -4,9 +4,14 @@ from __future__ import annotations
 
 import itertools
 import json
+import math
+import re
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from pathlib import Path
 
+import orjson
+
 
 @dataclass
 class PromptTemplate:
@@ -14,6 +19,17 @@ class PromptTemplate:
     system: str
     user: str
     variables: dict = field(default_factory=dict)
+    _expansion_count: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        self._expansion_count = math.prod(
+            len(v) for v in self.variables.values() if isinstance(v, list)
+        )
+
+    @property
+    def expansion_count(self) -> int:
+        """Number of variants expand() yields, without rendering any of them."""
+        return self._expansion_count
 
     def expand(self) -> list[tuple[dict, str, str]]:
         """Return one (variables_used, system, user) tuple per variable combination.
@@ -25,19 +41,64 @@ class PromptTemplate:
         Example — given variables {"year": [2020, 2022], "register": "casual"}
         this yields two tuples: one with year=2020 and one with year=2022.
         """
+        return list(self.iter_expand())
+
+    def iter_expand(self) -> Iterator[tuple[dict, str, str]]:
+        """Lazy form of expand(): renders each variant only when it is requested."""
         list_vars = {k: v for k, v in self.variables.items() if isinstance(v, list)}
         scalar_vars = {k: v for k, v in self.variables.items() if not isinstance(v, list)}
 
         if not list_vars:
             ctx = scalar_vars
-            return [(ctx, self.system.format_map(ctx), self.user.format_map(ctx))]
+            yield ctx, self.system.format_map(ctx), self.user.format_map(ctx)
+            return
 
         keys = list(list_vars.keys())
-        results = []
         for combo in itertools.product(*[list_vars[k] for k in keys]):
             ctx = {**scalar_vars, **dict(zip(keys, combo))}
-            results.append((ctx, self.system.format_map(ctx), self.user.format_map(ctx)))
-        return results
+            yield ctx, self.system.format_map(ctx), self.user.format_map(ctx)
+
+
+_NON_WS = re.compile(r"[^ \t\n\r]")
+
+
+def _to_entry(obj: dict) -> tuple[PromptTemplate, int | None]:
+    template = PromptTemplate(
+        id=obj["id"],
+        system=obj["system"],
+        user=obj["user"],
+        variables=obj.get("variables", {}),
+    )
+    return template, obj.get("logprobs")
+
+
+def iter_prompts(path: str | Path) -> Iterator[tuple[PromptTemplate, int | None]]:
+    """Lazily yield (template, logprobs) pairs from a prompt file.
+
+    Compact JSONL is streamed one line at a time, so each byte is read once and
+    templates are available before the whole file has been read. If the first
+    non-blank line is not a complete JSON object the file is taken to be
+    pretty-printed and parsed with load_prompts_pretty instead. A file that
+    switches to multi-line records after a compact first line raises ValueError
+    part-way through; load_prompts handles such mixed files.
+    """
+    first = True
+    with open(path, "rb") as fh:
+        for lineno, raw in enumerate(fh, start=1):
+            line = raw.strip()
+            if not line:
+                continue
+            try:
+                obj = orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                if first:
+                    break
+                raise ValueError(f"Invalid JSON in {path} at line {lineno}: {exc}") from exc
+            first = False
+            yield _to_entry(obj)
+        else:
+            return
+    yield from load_prompts_pretty(path)
 
 
 def load_prompts(path: str | Path) -> list[tuple[PromptTemplate, int | None]]:
@@ -49,26 +110,31 @@ def load_prompts(path: str | Path) -> list[tuple[PromptTemplate, int | None]]:
     Returns a list of (template, logprobs) pairs. logprobs is the integer value
     from the JSON 'logprobs' field, or None if not specified.
     """
+    try:
+        return list(iter_prompts(path))
+    except ValueError:
+        # Compact first record followed by multi-line ones; the pretty parser
+        # accepts any sequence of objects and reports genuinely bad JSON itself.
+        return load_prompts_pretty(path)
+
+
+def load_prompts_pretty(path: str | Path) -> list[tuple[PromptTemplate, int | None]]:
+    """Load a file of consecutive, possibly multi-line JSON objects.
+
+    Fallback for hand-edited, pretty-printed or mixed prompt files; load_prompts
+    and iter_prompts dispatch here automatically.
+    """
+    text = Path(path).read_text(encoding="utf-8")
     results: list[tuple[PromptTemplate, int | None]] = []
     decoder = json.JSONDecoder()
-    text = Path(path).read_text(encoding="utf-8")
     pos = 0
-    while pos < len(text):
-        # Skip whitespace (including blank lines between records).
-        while pos < len(text) and text[pos] in " \t\n\r":
-            pos += 1
-        if pos >= len(text):
-            break
+    # Jump straight to the start of each record, skipping blank lines between them.
+    while (m := _NON_WS.search(text, pos)) is not None:
+        pos = m.start()
         try:
             obj, end = decoder.raw_decode(text, pos)
         except json.JSONDecodeError as exc:
             raise ValueError(f"Invalid JSON in {path} at position {pos}: {exc}") from exc
-        template = PromptTemplate(
-            id=obj["id"],
-            system=obj["system"],
-            user=obj["user"],
-            variables=obj.get("variables", {}),
-        )
-        results.append((template, obj.get("logprobs")))
+        results.append(_to_entry(obj))
         pos = end
     return results
@@ -2,21 +2,32 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+import tempfile
+import time
 import uuid
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
 from datetime import datetime, timezone
 from typing import Any
 
+import orjson
+from aiolimiter import AsyncLimiter
 from tenacity import (
     retry,
     retry_if_exception,
     stop_after_attempt,
     wait_exponential,
 )
-from tqdm import tqdm
+from together import APIConnectionError
+from tqdm.asyncio import tqdm
 
-from .client import TogetherClient
+from .cache import ResponseCache, request_key
+from .client import DEFAULT_MAX_TOKENS, AsyncTogetherClient
 from .collector import ResponseCollector
+from .limits import TokenRateLimiter, estimate_tokens
 from .prompts import PromptTemplate
 
 logger = logging.getLogger(__name__)
@@ -24,61 +35,261 @@ logger = logging.getLogger(__name__)
 # Retry on Together rate-limit (429) or server errors (5xx).
 _RETRYABLE_STATUS = {429, 500, 502, 503, 504}
 
+_TERMINAL_BATCH_STATUS = {"COMPLETED", "FAILED", "EXPIRED", "CANCELLED"}
+
 
 def _is_retryable(exc: BaseException) -> bool:
+    # Per-call deadline hit; the server may just be slow. asyncio.TimeoutError is
+    # only an alias of TimeoutError from 3.11 on.
+    if isinstance(exc, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, APIConnectionError):  # includes APITimeoutError; transient network failure
+        return True
     status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
     return status in _RETRYABLE_STATUS
 
 
+class _StreamInterrupted(RuntimeError):
+    """A streamed call failed after some deltas were already written.
+
+    Not retryable: replaying the stream would write those deltas a second time.
+    """
+
+
+_api_retry = retry(
+    retry=retry_if_exception(_is_retryable),
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=2, max=30),
+    reraise=True,
+)
+
+
 class Runner:
     def __init__(
         self,
-        client: TogetherClient,
+        client: AsyncTogetherClient,
         collector: ResponseCollector,
         models: list[str],
         gen_kwargs: dict[str, Any] | None = None,
         run_id: str | None = None,
+        max_concurrency: int = 16,
+        rpm: int | None = None,
+        tpm: int | None = None,
+        dedupe: bool = False,
+        cache: ResponseCache | None = None,
+        dedupe_size: int = 4096,
+        stream: bool = False,
+        per_call_timeout: float | None = 120.0,
+        iso_timestamps: bool = False,
     ):
         self.client = client
         self.collector = collector
         self.models = models
         self.gen_kwargs = gen_kwargs or {}
         self.run_id = run_id or uuid.uuid4().hex
+        self.max_concurrency = max_concurrency
+        # Proactive limits keep us under the API ceiling instead of bouncing off 429s.
+        self.rpm = AsyncLimiter(rpm, 60) if rpm else None
+        self.tpm = TokenRateLimiter(tpm) if tpm else None
+        # Identical requests are coalesced when asked for, and always for greedy
+        # decoding where the API would return the same answer anyway.
+        self.dedupe = dedupe or self.gen_kwargs.get("temperature") == 0
+        self.cache = cache
+        self.dedupe_size = dedupe_size
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._done: OrderedDict[str, dict] = OrderedDict()
+        self.stream = stream
+        self.per_call_timeout = per_call_timeout
+        self.iso_timestamps = iso_timestamps
 
     def run(self, prompts: list[tuple[PromptTemplate, int | None]]) -> None:
-        """Iterate over every model × prompt expansion and collect responses.
+        """Synchronous convenience wrapper around run_async."""
+        asyncio.run(self.run_async(prompts))
 
-        Each prompt is expanded into one variant per variable combination before
-        the model loop, so list-valued variables produce separate requests.
+    async def run_async(self, prompts: list[tuple[PromptTemplate, int | None]]) -> None:
+        """Issue every model × prompt expansion concurrently and collect responses.
+
+        Each prompt is expanded into one variant per variable combination and sent
+        to every model, so list-valued variables produce separate requests. A pool
+        of max_concurrency workers pulls combinations from a bounded queue, so at
+        most that many requests are in flight; records are saved in completion order.
+        Combinations are rendered lazily as the queue drains, never all up front.
         """
-        # Expand prompts first so tqdm shows the true total request count.
-        expanded = [
-            (template.id, logprobs, variables, system_text, user_text)
-            for template, logprobs in prompts
-            for variables, system_text, user_text in template.expand()
-        ]
-        combos = [(model, *exp) for model in self.models for exp in expanded]
+        n_variants = sum(template.expansion_count for template, _ in prompts)
+        n_requests = len(self.models) * n_variants
         logger.info(
-            "Starting run %s — %d model(s) × %d prompt variant(s) = %d requests",
+            "Starting run %s — %d model(s) × %d prompt variant(s) = %d requests (concurrency %d)",
             self.run_id,
             len(self.models),
-            len(expanded),
-            len(combos),
+            n_variants,
+            n_requests,
+            self.max_concurrency,
         )
 
-        for model, prompt_id, logprobs, variables, system_text, user_text in tqdm(combos, desc="Prompting", unit="req"):
-            self._process(model, prompt_id, logprobs, variables, system_text, user_text)
+        # A bounded queue feeding a fixed pool of workers keeps only O(concurrency)
+        # coroutines alive, however many combinations the run has.
+        queue: asyncio.Queue[tuple | None] = asyncio.Queue(maxsize=2 * self.max_concurrency)
+
+        async def _produce() -> None:
+            for combo in self._iter_combos(prompts):
+                await queue.put(combo)
+            for _ in range(self.max_concurrency):
+                await queue.put(None)  # one shutdown sentinel per worker
+
+        async def _work(pbar: tqdm) -> None:
+            while (combo := await queue.get()) is not None:
+                record = await self._process(*combo)
+                if record is not None:
+                    self.collector.save(record)
+                pbar.update(1)
+
+        flusher = asyncio.create_task(self.collector.flush_periodically())
+        with tqdm(total=n_requests, desc="Prompting", unit="req") as pbar:
+            tasks = [asyncio.create_task(_produce())]
+            tasks += [asyncio.create_task(_work(pbar)) for _ in range(self.max_concurrency)]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+                flusher.cancel()
+
+    def _iter_combos(
+        self, prompts: list[tuple[PromptTemplate, int | None]]
+    ) -> Iterator[tuple[str, str, int | None, dict, str, str]]:
+        """Yield (model, prompt_id, logprobs, variables, system, user) per request."""
+        for template, logprobs in prompts:
+            for variables, system_text, user_text in template.iter_expand():
+                for model in self.models:
+                    yield model, template.id, logprobs, variables, system_text, user_text
+
+    @_api_retry
+    async def _acall(
+        self,
+        model: str,
+        messages: list[dict],
+        on_delta: Callable[[int, str], None] | None = None,
+        **extra_kwargs,
+    ) -> dict:
+        reservation = None
+        if self.tpm is not None:
+            # Budget for the prompt plus the most the completion could use.
+            max_tokens = self.gen_kwargs.get("max_tokens", DEFAULT_MAX_TOKENS)
+            estimate = estimate_tokens(messages) + max_tokens
+            reservation = await self.tpm.acquire(estimate)
+        emitted = False
+
+        def _emit(seq: int, text: str) -> None:
+            nonlocal emitted
+            emitted = True
+            on_delta(seq, text)
+
+        try:
+            if self.rpm is not None:
+                await self.rpm.acquire()
+            if on_delta is None:
+                call = self.client.complete(model, messages, **self.gen_kwargs, **extra_kwargs)
+            else:
+                call = self._astream(model, messages, _emit, **extra_kwargs)
+            start = time.perf_counter()
+            try:
+                # Bound the whole call, not just each socket read, so one stalled
+                # request can't hold a worker indefinitely.
+                result = await asyncio.wait_for(call, self.per_call_timeout)
+            finally:
+                logger.debug("model=%s call took %.2fs", model, time.perf_counter() - start)
+        except BaseException as exc:
+            # BaseException so a cancelled call also hands back its reservation.
+            if reservation is not None:
+                self.tpm.settle(reservation, 0)  # failed calls don't consume quota
+            if emitted and isinstance(exc, Exception):
+                raise _StreamInterrupted(f"stream failed after partial output: {exc!r}") from exc
+            raise
+        if reservation is not None and result.get("usage"):
+            self.tpm.settle(reservation, result["usage"]["total_tokens"])
+        return result
+
+    async def _astream(
+        self,
+        model: str,
+        messages: list[dict],
+        on_delta: Callable[[int, str], None],
+        **extra_kwargs,
+    ) -> dict:
+        """Stream a completion, passing each content delta to *on_delta* as it
+        arrives, and return the assembled result in the same shape as complete()."""
+        text_parts: list[str] = []
+        finish_reason = usage = None
+        async for chunk in self.client.stream(model, messages, **self.gen_kwargs, **extra_kwargs):
+            if chunk["text"]:
+                on_delta(len(text_parts), chunk["text"])
+                text_parts.append(chunk["text"])
+            finish_reason = chunk["finish_reason"] or finish_reason
+            usage = chunk["usage"] or usage
+        return {
+            "text": "".join(text_parts),
+            "model": model,
+            "finish_reason": finish_reason,
+            "usage": usage,
+            "logprobs": None,
+        }
+
+    async def _dedupe_call(
+        self,
+        model: str,
+        messages: list[dict],
+        on_delta: Callable[[int, str], None] | None = None,
+        **extra_kwargs,
+    ) -> tuple[dict, bool]:
+        """_acall, but sharing one result between identical requests when dedupe is on.
+
+        Lookup order is the in-memory LRU of finished results, then requests already
+        in flight, then the on-disk cache; only a miss on all three hits the API.
+        Returns (result, fresh), where fresh is False if the result was shared or
+        cached (in which case *on_delta* was never called).
+        """
+        if not self.dedupe:
+            return await self._acall(model, messages, on_delta, **extra_kwargs), True
+
+        key = request_key(model, messages, {**self.gen_kwargs, **extra_kwargs})
+        if key in self._done:
+            self._done.move_to_end(key)
+            return self._done[key], False
+        if key in self._inflight:
+            return await asyncio.shield(self._inflight[key]), False
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._remember(key, cached)
+                return cached, False
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[key] = fut
+        try:
+            result = await self._acall(model, messages, on_delta, **extra_kwargs)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as exc:
+            fut.set_exception(exc)
+            fut.exception()  # mark retrieved; waiters (if any) re-raise it themselves
+            raise
+        else:
+            fut.set_result(result)
+        finally:
+            del self._inflight[key]
+
+        self._remember(key, result)
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result, True
 
-    @retry(
-        retry=retry_if_exception(_is_retryable),
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=30),
-        reraise=True,
-    )
-    def _call(self, model: str, messages: list[dict], **extra_kwargs) -> dict:
-        return self.client.complete(model, messages, **self.gen_kwargs, **extra_kwargs)
+    def _remember(self, key: str, result: dict) -> None:
+        self._done[key] = result
+        if len(self._done) > self.dedupe_size:
+            self._done.popitem(last=False)
 
-    def _process(
+    async def _process(
         self,
         model: str,
         prompt_id: str,
@@ -86,19 +297,72 @@ class Runner:
         variables: dict,
         system_text: str,
         user_text: str,
-    ) -> None:
+    ) -> dict | None:
+        """Run one request and build its output record, or return None on failure."""
         messages = [
             {"role": "system", "content": system_text},
             {"role": "user", "content": user_text},
         ]
         extra = {"logprobs": logprobs} if logprobs is not None else {}
+
+        # Streamed responses are written as delta records while they generate,
+        # tied to their final record by call_id. A stream that fails part-way is
+        # not retried, so a call_id never carries two runs of deltas; instead its
+        # final record carries the error in place of a response. Logprob
+        # requests are never streamed since the per-chunk logprobs don't match
+        # the full-response shape.
+        on_delta = None
+        streamed = self.stream and logprobs is None
+        if streamed:
+            call_id = uuid.uuid4().hex
+
+            def on_delta(seq: int, text: str) -> None:
+                self.collector.save({
+                    "type": "delta",
+                    "run_id": self.run_id,
+                    "call_id": call_id,
+                    "model": model,
+                    "prompt_id": prompt_id,
+                    "seq": seq,
+                    "text": text,
+                })
+
         try:
-            result = self._call(model, messages, **extra)
+            result, fresh = await self._dedupe_call(model, messages, on_delta, **extra)
         except Exception as exc:
             logger.error("Failed model=%s prompt=%s: %s", model, prompt_id, exc)
-            return
+            if isinstance(exc, _StreamInterrupted):
+                # Close off the deltas already written so they don't look in-flight.
+                self.collector.save({
+                    "type": "final",
+                    "call_id": call_id,
+                    "run_id": self.run_id,
+                    "model": model,
+                    "prompt_id": prompt_id,
+                    "error": str(exc),
+                    "timestamp": self._timestamp(),
+                })
+            return None
 
-        record = {
+        record = self._build_record(
+            model, prompt_id, logprobs, variables, system_text, user_text, result
+        )
+        # Shared or cached answers had no deltas, so they get a plain record.
+        if streamed and fresh:
+            record = {"type": "final", "call_id": call_id, **record}
+        return record
+
+    def _build_record(
+        self,
+        model: str,
+        prompt_id: str,
+        logprobs: int | None,
+        variables: dict,
+        system_text: str,
+        user_text: str,
+        result: dict,
+    ) -> dict:
+        return {
             "run_id": self.run_id,
             "model": model,
             "prompt_id": prompt_id,
@@ -109,6 +373,107 @@ class Runner:
             "logprobs": result.get("logprobs") if logprobs is not None else None,
             "finish_reason": result.get("finish_reason"),
             "usage": result.get("usage"),
-            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "timestamp": self._timestamp(),
         }
-        self.collector.save(record)
+
+    def _timestamp(self) -> float | str:
+        """Record time as Unix epoch seconds, or a UTC ISO-8601 string if requested.
+
+        The epoch float is a plain clock read; formatting a datetime per record
+        costs roughly 40x more and downstream tools can format it when needed.
+        """
+        if self.iso_timestamps:
+            return datetime.now(timezone.utc).isoformat()
+        return time.time()
+
+
+class BatchFailedError(RuntimeError):
+    """A submitted batch job ended without usable output (FAILED, EXPIRED, ...)."""
+
+
+class BatchRunner(Runner):
+    """Runner that submits every combination as one Together batch job.
+
+    The requests are written to a JSONL input file, uploaded and processed
+    server-side; the runner polls the job with exponential backoff and saves one
+    record per output line once it completes. Batch jobs are cheaper and are not
+    subject to per-request rate limits, at the cost of latency (the completion
+    window is up to 24h). If the batch cannot be submitted, for example because
+    a model isn't offered for batch inference, the run falls back to per-request
+    calls. Streaming, dedupe/cache and the concurrency and rate limits only
+    apply to that fallback.
+    """
+
+    poll_min = 5.0
+    poll_max = 60.0
+
+    async def run_async(self, prompts: list[tuple[PromptTemplate, int | None]]) -> None:
+        combos: dict[str, tuple] = {}
+        lines = []
+        for i, combo in enumerate(self._iter_combos(prompts)):
+            model, prompt_id, logprobs, variables, system_text, user_text = combo
+            custom_id = f"{model}:{prompt_id}:{i}"
+            combos[custom_id] = combo
+            body = {
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": system_text},
+                    {"role": "user", "content": user_text},
+                ],
+                "max_tokens": DEFAULT_MAX_TOKENS,
+                **self.gen_kwargs,
+            }
+            if logprobs is not None:
+                body["logprobs"] = logprobs
+            lines.append(orjson.dumps({"custom_id": custom_id, "body": body}))
+
+        logger.info("Starting batch run %s — %d requests", self.run_id, len(combos))
+        with tempfile.NamedTemporaryFile(suffix=".jsonl", delete=False) as fh:
+            fh.write(b"\n".join(lines) + b"\n")
+        try:
+            batch_id = await self._submit(fh.name)
+        except Exception as exc:
+            logger.warning("Batch submission failed (%s); falling back to per-request calls.", exc)
+            await super().run_async(prompts)
+            return
+        finally:
+            os.unlink(fh.name)
+
+        status = await self._wait(batch_id)
+        if status["status"] != "COMPLETED" or not status["output_file_id"]:
+            logger.error(
+                "Batch %s ended with status %s: %s", batch_id, status["status"], status["error"]
+            )
+            raise BatchFailedError(f"Batch {batch_id} ended with status {status['status']}")
+
+        saved = 0
+        async for custom_id, result, error in self.client.batch_results(status["output_file_id"]):
+            combo = combos.get(custom_id)
+            if combo is None:
+                continue
+            if result is None:
+                logger.error("Failed model=%s prompt=%s: %s", combo[0], combo[1], error)
+                continue
+            self.collector.save(self._build_record(*combo, result))
+            saved += 1
+        logger.info("Batch %s saved %d/%d responses", batch_id, saved, len(combos))
+
+    @_api_retry
+    async def _submit(self, input_path: str) -> str:
+        return await self.client.submit_batch(input_path)
+
+    @_api_retry
+    async def _status(self, batch_id: str) -> dict:
+        return await self.client.batch_status(batch_id)
+
+    async def _wait(self, batch_id: str) -> dict:
+        """Poll *batch_id* with exponential backoff until it reaches a terminal state."""
+        delay = self.poll_min
+        with tqdm(total=100, desc=f"Batch {batch_id}", unit="%") as pbar:
+            while True:
+                status = await self._status(batch_id)
+                pbar.update((status["progress"] or 0) - pbar.n)
+                if status["status"] in _TERMINAL_BATCH_STATUS:
+                    return status
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.poll_max)
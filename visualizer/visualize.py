@@ -15,28 +15,47 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
-import math
 import numpy as np
+import orjson
 
 
 # ---------------------------------------------------------------------------
 # Loading
 # ---------------------------------------------------------------------------
 
+_WS = re.compile(r"[ \t\r\n]+")
+
+
 def _load_records(path: Path) -> list[dict]:
-    """Parse a pretty-printed JSONL file into a list of dicts."""
+    """Parse a JSONL response file into a list of dicts.
+
+    Compact files (one record per line) are parsed line by line; files written
+    with --pretty fall back to scanning for consecutive JSON values.
+    """
+    data = path.read_bytes()
+    try:
+        return [orjson.loads(line) for line in data.split(b"\n") if line.strip()]
+    except orjson.JSONDecodeError:
+        pass
+
+    text = data.decode("utf-8")
     decoder = json.JSONDecoder()
-    text = path.read_text(encoding="utf-8")
     records: list[dict] = []
     pos = 0
     while pos < len(text):
-        while pos < len(text) and text[pos] in " \t\n\r":
-            pos += 1
+        # Skip the whitespace between records in one C-level regex match.
+        m = _WS.match(text, pos)
+        if m:
+            pos = m.end()
         if pos >= len(text):
             break
         obj, end = decoder.raw_decode(text, pos)
@@ -57,113 +76,149 @@ def _row_label(record: dict) -> str:
     return f"{model}\n{var_str}" if var_str else model
 
 
-def render(records: list[dict], output: Path | None = None) -> None:
-    """Build and display (or save) a heatmap matrix for *records*.
+def _init_worker() -> None:
+    # Render off-screen in worker processes; they have no display to draw to.
+    matplotlib.use("Agg")
 
-    Records that have no logprobs data are silently skipped.
-    """
-    lp_records = [r for r in records if r.get("logprobs")]
-    if not lp_records:
-        print("No records with logprobs data found.", file=sys.stderr)
-        sys.exit(1)
 
-    # --- build one figure per record --------------------------------------
+def _render_one(record: dict, output_path: Path | None) -> Path | None:
+    """Build the heatmap for one record and save it to *output_path*, or show it
+    interactively when no path is given.
+
+    Returns the saved path, or None if the record was skipped or only shown.
+    Top-level so render() can run it in worker processes.
+    """
     # Each record gets its own matrix: rows = rank, cols = token position.
     # logprobs.content[pos].top_logprobs[rank] holds each cell's data.
+    content = (record.get("logprobs") or {}).get("content") or []
+    if not content:
+        print(f"Skipping record {record.get('prompt_id')} — empty content.", file=sys.stderr)
+        return None
+
+    n_cols = len(content)
+    n_rows = max(len(pos["top_logprobs"]) for pos in content)
+
+    # Cell values live in one contiguous float32 grid (NaN where a position
+    # has fewer alternatives); tokens are kept as parallel flat arrays of
+    # (token, row, col) instead of a boxed object grid.
+    prob_grid = np.full((n_rows, n_cols), np.nan, dtype=np.float32)
+    tokens_flat: list[str] = []
+    rows_flat: list[int] = []
+    cols_flat: list[int] = []
+
+    for col, pos_data in enumerate(content):
+        for row, alt in enumerate(pos_data["top_logprobs"]):
+            prob_grid[row, col] = alt["logprob"]
+            tokens_flat.append(alt["token"])
+            rows_flat.append(row)
+            cols_flat.append(col)
+
+    rows_idx = np.array(rows_flat, dtype=np.int32)
+    cols_idx = np.array(cols_flat, dtype=np.int32)
+    # Convert the logprobs back to softmaxed values in place (NaN stays NaN).
+    np.exp(prob_grid, out=prob_grid)
+
+    # --- figure layout ------------------------------------------------
+    CELL_W, CELL_H = 2.2, 1.4          # fixed inches per cell
+    fig_w = n_cols * CELL_W + 3        # +3 for y-axis labels
+    fig_h = n_rows * CELL_H + 2        # +2 for title and x-axis labels
+
+    fig, ax = plt.subplots(figsize=(fig_w, fig_h))
+
+    # --- heatmap ------------------------------------------------------
+    # Values are now probabilities in [0, 1]; fix the scale accordingly.
+    norm = plt.Normalize(vmin=0, vmax=1)
+    im = ax.imshow(
+        prob_grid,
+        aspect="auto",
+        cmap="RdYlGn",
+        norm=norm,
+        interpolation="nearest",
+    )
 
-    for record in lp_records:
-        content = (record.get("logprobs") or {}).get("content") or []
-        if not content:
-            print(f"Skipping record {record.get('prompt_id')} — empty content.", file=sys.stderr)
-            continue
-
-        n_cols = len(content)
-        n_rows = max(len(pos["top_logprobs"]) for pos in content)
-
-        token_grid = np.empty((n_rows, n_cols), dtype=object)
-        logprob_grid = np.full((n_rows, n_cols), np.nan)
-
-        for col, pos_data in enumerate(content):
-            for row, alt in enumerate(pos_data["top_logprobs"]):
-                token_grid[row, col] = alt["token"]
-                # Convert the logprob back to the softmaxed value.
-                logprob_grid[row, col] = math.exp(alt["logprob"])
-
-        # --- figure layout ------------------------------------------------
-        CELL_W, CELL_H = 2.2, 1.4          # fixed inches per cell
-        fig_w = n_cols * CELL_W + 3        # +3 for y-axis labels
-        fig_h = n_rows * CELL_H + 2        # +2 for title and x-axis labels
-
-        fig, ax = plt.subplots(figsize=(fig_w, fig_h))
-
-        # --- heatmap ------------------------------------------------------
-        # Values are now probabilities in [0, 1]; fix the scale accordingly.
-        norm = plt.Normalize(vmin=0, vmax=1)
-        im = ax.imshow(
-            logprob_grid,
-            aspect="auto",
-            cmap="RdYlGn",
-            norm=norm,
-            interpolation="nearest",
+    # --- cell annotations ---------------------------------------------
+    # Adaptive text colour: white on dark cells, black on light, decided for
+    # the whole grid at once from each cell's colormap luminance.
+    rgb = plt.cm.RdYlGn(norm(prob_grid))[..., :3]
+    luma = rgb @ np.array([0.299, 0.587, 0.114])
+    text_colors = np.where(luma > 0.45, "black", "white")
+    cell_vals = prob_grid[rows_idx, cols_idx]
+    cell_colors = text_colors[rows_idx, cols_idx]
+    for tok, row, col, val, text_color in zip(tokens_flat, rows_flat, cols_flat, cell_vals, cell_colors):
+        # Replace whitespace chars so they render visibly.
+        display = tok.replace(" ", "·").replace("\n", "↵").replace("\t", "→")
+        ax.text(
+            col, row,
+            f"{display}\n{val:.3f}",
+            ha="center", va="center",
+            fontsize=10,
+            color=text_color,
         )
 
-        # --- cell annotations ---------------------------------------------
-        cmap = plt.cm.RdYlGn
-        for row in range(n_rows):
-            for col in range(n_cols):
-                tok = token_grid[row, col]
-                val = logprob_grid[row, col]
-                if tok is None or np.isnan(val):
-                    continue
-                # Adaptive text colour: white on dark cells, black on light.
-                r, g, b, _ = cmap(norm(val))
-                text_color = "black" if (0.299 * r + 0.587 * g + 0.114 * b) > 0.45 else "white"
-                # Replace whitespace chars so they render visibly.
-                display = tok.replace(" ", "·").replace("\n", "↵").replace("\t", "→")
-                ax.text(
-                    col, row,
-                    f"{display}\n{val:.3f}",
-                    ha="center", va="center",
-                    fontsize=10,
-                    color=text_color,
-                )
-
-        # --- axes labels --------------------------------------------------
-        selected = [pos["token"].replace(" ", "·").replace("\n", "↵") for pos in content]
-        ax.set_xticks(range(n_cols))
-        ax.set_xticklabels(selected, fontsize=9, rotation=45, ha="right")
-        ax.set_xlabel("Selected token at each position", fontsize=10)
-
-        ax.set_yticks(range(n_rows))
-        ax.set_yticklabels([f"rank {i + 1}" for i in range(n_rows)], fontsize=10)
-
-        title = f"{record.get('prompt_id', '')}  |  {record.get('model', '')}"
-        if record.get("variables"):
-            title += f"  |  {record['variables']}"
-        ax.set_title(title, fontsize=12, pad=12)
-
-        # --- colorbar -----------------------------------------------------
-        cbar = fig.colorbar(im, ax=ax, shrink=0.6, pad=0.01)
-        cbar.set_label("probability", fontsize=10)
-        cbar.ax.tick_params(labelsize=9)
-
-        fig.tight_layout()
-
-        if output:
-            idx = lp_records.index(record)
-            out_path = (
-                output.with_name(f"{output.stem}_{idx}{output.suffix or '.png'}")
-                if len(lp_records) > 1
-                else output
-            )
-            fig.savefig(out_path, dpi=200, bbox_inches="tight")
-            print(f"Saved: {out_path}")
-        else:
-            plt.show()
+    # --- axes labels --------------------------------------------------
+    selected = [pos["token"].replace(" ", "·").replace("\n", "↵") for pos in content]
+    ax.set_xticks(range(n_cols))
+    ax.set_xticklabels(selected, fontsize=9, rotation=45, ha="right")
+    ax.set_xlabel("Selected token at each position", fontsize=10)
 
+    ax.set_yticks(range(n_rows))
+    ax.set_yticklabels([f"rank {i + 1}" for i in range(n_rows)], fontsize=10)
+
+    title = f"{record.get('prompt_id', '')}  |  {record.get('model', '')}"
+    if record.get("variables"):
+        title += f"  |  {record['variables']}"
+    ax.set_title(title, fontsize=12, pad=12)
+
+    # --- colorbar -----------------------------------------------------
+    cbar = fig.colorbar(im, ax=ax, shrink=0.6, pad=0.01)
+    cbar.set_label("probability", fontsize=10)
+    cbar.ax.tick_params(labelsize=9)
+
+    fig.tight_layout()
+
+    try:
+        if output_path is None:
+            plt.show()
+            return None
+        fig.savefig(output_path, dpi=200, bbox_inches="tight")
+        return output_path
+    finally:
         plt.close(fig)
 
 
+def render(records: list[dict], output: Path | None = None) -> None:
+    """Build and display (or save) a heatmap matrix for *records*.
+
+    Records that have no logprobs data are silently skipped. When saving, each
+    record's figure is rendered in its own worker process, since Matplotlib
+    rendering is CPU-bound and single-threaded; interactive display stays serial.
+    """
+    lp_records = [r for r in records if r.get("logprobs")]
+    if not lp_records:
+        print("No records with logprobs data found.", file=sys.stderr)
+        sys.exit(1)
+
+    if output is None:
+        for record in lp_records:
+            _render_one(record, None)
+        return
+
+    if len(lp_records) == 1:
+        saved = [_render_one(lp_records[0], output)]
+    else:
+        out_paths = [
+            output.with_name(f"{output.stem}_{idx}{output.suffix or '.png'}")
+            for idx in range(len(lp_records))
+        ]
+        workers = min(os.cpu_count() or 1, len(lp_records))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as ex:
+            saved = list(ex.map(_render_one, lp_records, out_paths))
+
+    for path in saved:
+        if path is not None:
+            print(f"Saved: {path}")
+
+
 
 # ---------------------------------------------------------------------------
 # CLI